@@ -45,9 +45,9 @@ Synopsis for deterministic training with multiple hosts:
       split=split,
       rng=rng
   )
-  ds_iter = iter(ds)
+  ds_iter = deterministic_data.create_iterator(ds)
   for _ in range(num_train_steps):
-    batch = jax.tree_map(lambda x: x._numpy(), next(ds_iter)
+    batch = next(ds_iter)  # Already numpy; converted on a background thread.
     # (training step)
 
 """
@@ -55,7 +55,10 @@ Synopsis for deterministic training with multiple hosts:
 import enum
 import functools
 import operator
-from typing import Callable, Dict, Literal, Optional, Sequence, Union
+import os
+import queue
+import threading
+from typing import Any, Callable, Dict, Iterator, Literal, Optional, Sequence, Union
 
 from absl import logging
 
@@ -283,11 +286,66 @@ def get_read_instruction_for_host(
     return functools.reduce(operator.add, sharded_read_instructions)
 
 
+def shard_dataset_for_host(
+    ds: tf.data.Dataset,
+    num_examples: Optional[int] = None,
+    *,
+    host_id: Optional[int] = None,
+    host_count: Optional[int] = None,
+    drop_remainder: bool = True,
+) -> tf.data.Dataset:
+    """Returns this host's shard of an already constructed dataset.
+
+    Unlike `get_read_instruction_for_host()`, which computes a per-host
+    `ReadInstruction` before reading, this shards *after* the reader: every
+    host opens the same files (sharing the OS page cache) and `ds.shard`
+    assigns every `host_count`-th example to this host, so no per-host split
+    has to be recomputed when the dataset definition changes.
+
+    Args:
+      ds: Dataset to shard. Must yield examples in the same order on all hosts.
+      num_examples: Number of examples in `ds`. Only needed when
+        `drop_remainder` is set and the cardinality cannot be retrieved via
+        `ds.cardinality()` (e.g. because of `ds.filter()`).
+      host_id: Optional, host index in [0, host_count). Defaults to
+        `jax.process_index()`.
+      host_count: Optional, number of hosts. Defaults to `jax.process_count()`.
+      drop_remainder: Whether to drop the trailing examples that cannot be
+        divided evenly, so that every host receives the same number of
+        examples.
+
+    Returns:
+      The dataset containing this host's examples.
+    """
+    if host_id is None:
+        host_id = jax.process_index()
+    if host_count is None:
+        host_count = jax.process_count()
+    if host_id < 0 or host_id >= host_count or host_count < 1:
+        raise ValueError(
+            f"Invalid combination of host_id ({host_id}) and host_count "
+            f"({host_count})."
+        )
+    if drop_remainder:
+        if num_examples is None:
+            num_examples = int(ds.cardinality())
+            if num_examples < 0:
+                raise ValueError(
+                    "Cannot determine dataset cardinality. This can happen when "
+                    "you use a `.filter()` on the dataset. Please provide "
+                    "`num_examples` when using `drop_remainder`."
+                )
+        ds = ds.take(num_examples - num_examples % host_count)
+    return ds.shard(host_count, host_id)
+
+
 def _preprocess_with_per_example_rng(
     ds: tf.data.Dataset,
     preprocess_fn: Callable[[Features], Features],
     *,
     rng: jnp.ndarray,
+    window_size: Optional[int] = None,
+    deterministic: Optional[bool] = None,
 ) -> tf.data.Dataset:
     """Maps `ds` using the preprocess_fn and a deterministic RNG per example.
 
@@ -299,22 +357,147 @@ def _preprocess_with_per_example_rng(
         convertible into a TF graph.
       rng: Base RNG to use. Per example RNGs will be derived from this by folding
         in the example index.
+      window_size: Optional number of examples for which to derive RNGs at once.
+        When set, one `stateless_fold_in` per window plus a single
+        `stateless_split` replaces one fold per example. The derived keys
+        differ from (but are as deterministic as) the per-example path, and all
+        features must have equal shapes across examples since the examples are
+        windowed into batches while the keys are attached.
+      deterministic: Forwarded to the parallel `.map()` calls. `None` defers to
+        the pipeline-level `tf.data.Options.deterministic` setting.
 
     Returns:
       The dataset mapped by the `preprocess_fn`.
     """
 
-    def _fn(example_index: int, features: Features) -> Features:
-        example_index = tf.cast(example_index, tf.int32)
-        features["rng"] = tf.random.experimental.stateless_fold_in(
-            tf.cast(rng, tf.int64), example_index
+    # Cast once at pipeline construction instead of inside the mapped function.
+    # Keep `stateless_fold_in` for the actual derivation: replacing it with a
+    # cheaper fold would silently change every derived key and break
+    # reproducibility of existing pipelines.
+    rng = tf.cast(rng, tf.int64)
+
+    if window_size is None:
+
+        def _fn(example_index: int, features: Features) -> Features:
+            example_index = tf.cast(example_index, tf.int32)
+            features = {
+                **features,
+                "rng": tf.random.experimental.stateless_fold_in(rng, example_index),
+            }
+            processed = preprocess_fn(features)
+            if isinstance(processed, dict):
+                processed.pop("rng", None)
+            return processed
+
+        if isinstance(ds.element_spec, dict):
+            # Trace exactly once against the known element spec; pipelines that
+            # share this helper then reuse the same concrete function instead
+            # of retracing.
+            _fn = tf.function(
+                _fn,
+                input_signature=[tf.TensorSpec([], tf.int64), ds.element_spec],
+            )
+        return ds.enumerate().map(
+            _fn, num_parallel_calls=AUTOTUNE, deterministic=deterministic
+        )
+
+    def _attach_rngs(window_index: int, features: Features) -> Features:
+        window_rng = tf.random.experimental.stateless_fold_in(
+            rng, tf.cast(window_index, tf.int32)
         )
+        # Slice in case the final window is partial.
+        num_examples = tf.shape(tf.nest.flatten(features)[0])[0]
+        features["rng"] = tf.random.experimental.stateless_split(
+            window_rng, num=window_size
+        )[:num_examples]
+        return features
+
+    def _fn(features: Features) -> Features:
         processed = preprocess_fn(features)
         if isinstance(processed, dict) and "rng" in processed:
             del processed["rng"]
         return processed
 
-    return ds.enumerate().map(_fn, num_parallel_calls=AUTOTUNE)
+    return (
+        ds.batch(window_size)
+        .enumerate()
+        .map(_attach_rngs, num_parallel_calls=AUTOTUNE, deterministic=deterministic)
+        .unbatch()
+        .map(_fn, num_parallel_calls=AUTOTUNE, deterministic=deterministic)
+    )
+
+
+def _vectorized_preprocess(
+    ds: tf.data.Dataset,
+    preprocess_fn: Callable[[Features], Features],
+    *,
+    batch_size: int,
+    rng: Optional[jnp.ndarray] = None,
+    deterministic: Optional[bool] = None,
+) -> tf.data.Dataset:
+    """Maps `ds` of batched examples using `tf.vectorized_map(preprocess_fn)`.
+
+    Args:
+      ds: Dataset of already batched Python dictionaries with the features. The
+        'rng' feature should not exist.
+      preprocess_fn: Per-example preprocessing function (as for
+        `_preprocess_with_per_example_rng`) that will be vectorized over the
+        batch dimension.
+      rng: Optional base RNG. Per example RNGs are derived from this by folding
+        in the batch index and splitting the result `batch_size` ways, which is
+        cheaper than one `stateless_fold_in` per example but yields different
+        (still deterministic) keys than the per-example path.
+      deterministic: Forwarded to the parallel `.map()` calls. `None` defers to
+        the pipeline-level `tf.data.Options.deterministic` setting.
+
+    Returns:
+      The dataset with `preprocess_fn` applied to whole batches.
+    """
+    if rng is None:
+
+        def _map_fn(features: Features) -> Features:
+            return tf.vectorized_map(preprocess_fn, features)
+
+        return ds.map(
+            _map_fn, num_parallel_calls=AUTOTUNE, deterministic=deterministic
+        )
+
+    def _fn(batch_index: int, features: Features) -> Features:
+        batch_index = tf.cast(batch_index, tf.int32)
+        batch_rng = tf.random.experimental.stateless_fold_in(
+            tf.cast(rng, tf.int64), batch_index
+        )
+        # Slice in case the final batch is partial (drop_remainder=False).
+        num_examples = tf.shape(tf.nest.flatten(features)[0])[0]
+        features["rng"] = tf.random.experimental.stateless_split(
+            batch_rng, num=batch_size
+        )[:num_examples]
+        processed = tf.vectorized_map(preprocess_fn, features)
+        if isinstance(processed, dict) and "rng" in processed:
+            del processed["rng"]
+        return processed
+
+    return ds.enumerate().map(
+        _fn, num_parallel_calls=AUTOTUNE, deterministic=deterministic
+    )
+
+
+def _add_mask_to_preprocessed_features(
+    preprocess_fn: Callable[[Features], Features],
+) -> Callable[[Features], Features]:
+    """Extends `preprocess_fn` to also set a "mask" feature to `True`.
+
+    Folding the mask into the preprocessing function avoids a separate
+    per-element `.map()` stage between preprocessing and batching (see
+    `pad_dataset(add_mask=False)`).
+    """
+
+    def _fn(features: Features) -> Features:
+        features = preprocess_fn(features)
+        features["mask"] = True
+        return features
+
+    return _fn
 
 
 def pad_dataset(
@@ -323,6 +506,7 @@ def pad_dataset(
     batch_dims: Sequence[int],
     pad_up_to_batches: Optional[int] = None,
     cardinality: Optional[int] = None,
+    add_mask: bool = True,
 ):
     """Adds padding to a dataset.
 
@@ -345,6 +529,10 @@ def pad_dataset(
       cardinality: Number of examples in the dataset. Only needed when the
         cardinality cannot be retrieved via `ds.cardinalty()` (e.g. because of
         using `ds.filter()`).
+      add_mask: Whether to add the "mask" feature to `dataset`. Set to `False`
+        when the "mask" feature was already added upstream (e.g. fused into the
+        preprocessing function), in which case `dataset` must already contain
+        it.
 
     Returns:
       The padded dataset, with the added feature "mask" that is set to `True` for
@@ -360,26 +548,97 @@ def pad_dataset(
                 "a `.filter()` on the dataset. Please provide the cardinality as an "
                 "argument to `create_dataset()`."
             )
-    if "mask" in dataset.element_spec:
-        raise ValueError('Dataset already contains a feature named "mask".')
+    # Do the padding arithmetic once, on plain Python integers (in eager mode
+    # `dataset.cardinality()` is a tensor).
+    cardinality = int(cardinality)
+    batch_size = int(np.prod(batch_dims))
+    if add_mask:
+        if "mask" in dataset.element_spec:
+            raise ValueError('Dataset already contains a feature named "mask".')
+    elif "mask" not in dataset.element_spec:
+        raise ValueError(
+            'Dataset must already contain a feature named "mask" when '
+            "add_mask=False."
+        )
     if pad_up_to_batches is None:
-        pad_up_to_batches = int(np.ceil(cardinality / np.prod(batch_dims)))
+        pad_up_to_batches = int(np.ceil(cardinality / batch_size))
 
-    filler_element = tf.nest.map_structure(
-        lambda spec: tf.zeros(spec.shape, spec.dtype)[None], dataset.element_spec
-    )
-    filler_element["mask"] = [False]
-    filler_dataset = tf.data.Dataset.from_tensor_slices(filler_element)
+    if add_mask:
+        dataset = dataset.map(
+            lambda features: dict(mask=True, **features), num_parallel_calls=AUTOTUNE
+        )
+    padding = pad_up_to_batches * batch_size - cardinality
+    if padding < 0:
+        raise ValueError(
+            f"Invalid padding={padding} (batch_dims={batch_dims}, cardinality="
+            f"{cardinality}, pad_up_to_batches={pad_up_to_batches})"
+        )
+    if padding == 0:
+        return dataset
+
+    # Generate filler elements lazily inside a map instead of materializing a
+    # dict of zero tensors up front; this keeps host memory flat and lets the
+    # padded tail be produced in parallel with the real read.
+    filler_spec = dataset.element_spec
 
-    dataset = dataset.map(
-        lambda features: dict(mask=True, **features), num_parallel_calls=AUTOTUNE
+    def _filler_element(_) -> Features:
+        filler = tf.nest.map_structure(
+            lambda spec: tf.zeros(spec.shape, spec.dtype), filler_spec
+        )
+        filler["mask"] = False
+        return filler
+
+    filler_dataset = tf.data.Dataset.range(padding).map(
+        _filler_element, num_parallel_calls=AUTOTUNE
     )
-    padding = pad_up_to_batches * np.prod(batch_dims) - int(cardinality)
-    assert padding >= 0, (
-        f"Invalid padding={padding} (batch_dims={batch_dims}, cardinality="
-        f"{cardinality}, pad_up_to_batches={pad_up_to_batches})"
+    return dataset.concatenate(filler_dataset)
+
+
+def skip_decoders(
+    dataset_builder: tfds.core.DatasetBuilder,
+) -> Dict[str, tfds.decode.Decoder]:
+    """Returns decoders that skip decoding of image and video features.
+
+    Decoding heavyweight features at read time is wasted work for examples that
+    a `filter_fn` drops, and for pipelines whose `preprocess_fn` decodes again
+    anyway (e.g. decode-and-crop). Pass the result as `decoders` to
+    `create_dataset()` to keep such features as encoded bytes: `filter_fn` then
+    runs before any decoding, and `preprocess_fn` must decode the features
+    itself (e.g. with `tf.io.decode_jpeg`).
+
+    Args:
+      dataset_builder: TFDS dataset builder whose features to inspect.
+
+    Returns:
+      A dictionary mapping the names of all image and video features to
+      `tfds.decode.SkipDecoding()`.
+    """
+    return {
+        name: tfds.decode.SkipDecoding()
+        for name, feature in dataset_builder.info.features.items()
+        if isinstance(feature, (tfds.features.Image, tfds.features.Video))
+    }
+
+
+def decode_image_feature(features: Features, key: str = "image") -> Features:
+    """Decodes an image feature that was read as encoded bytes.
+
+    A building block for `preprocess_fn`s used with
+    `create_dataset(skip_image_decoding=True)`. Decodes with the INTEGER_FAST
+    DCT method, which roughly halves JPEG decode cost at visually negligible
+    quality loss.
+
+    Args:
+      features: Dictionary of features containing the encoded image.
+      key: Name of the encoded image feature.
+
+    Returns:
+      The features dictionary with `key` decoded to a uint8 RGB tensor.
+    """
+    features[key] = tf.io.decode_jpeg(
+        features[key], channels=3, fancy_upscaling=False, dct_method="INTEGER_FAST"
     )
-    return dataset.concatenate(filler_dataset.repeat(padding))
+    return features
 
 
 def create_dataset(
@@ -388,18 +647,32 @@ def create_dataset(
     split: Union[str, tfds.core.ReadInstruction],
     batch_dims: Sequence[int] = (),
     rng: Union[None, jnp.ndarray, tf.Tensor] = None,
+    rng_window_size: Optional[int] = None,
     filter_fn: Optional[Callable[[Features], bool]] = None,
     preprocess_fn: Optional[Callable[[Features], Features]] = None,
+    vectorize: bool = False,
     decoders: Optional[Dict[str, tfds.decode.Decoder]] = None,
-    cache: bool = False,
+    skip_image_decoding: bool = False,
+    interleave_cycle_length: Optional[int] = None,
+    interleave_block_length: Optional[int] = None,
+    cache: Union[Literal["loaded", "preprocessed"], bool] = False,
+    cache_path: Optional[str] = None,
     num_epochs: Optional[int] = None,
     repeat_after_batching: bool = False,
     shuffle: Union[Literal["loaded", "preprocessed"], bool] = "loaded",
     shuffle_buffer_size: int = 10_000,
-    prefetch_size: int = 4,
+    prefetch_size: int = tf.data.AUTOTUNE,
+    autotune_ram_budget: Optional[int] = None,
+    autotune_cpu_budget: Optional[int] = None,
+    private_threadpool_size: Optional[int] = None,
+    max_intra_op_parallelism: int = 1,
     pad_up_to_batches: Optional[Union[int, str]] = None,
     cardinality: Optional[int] = None,
     drop_remainder: bool = True,
+    deterministic_order: bool = True,
+    service_address: Optional[str] = None,
+    service_job_name: Optional[str] = None,
+    service_compression: Optional[str] = "AUTO",
 ) -> tf.data.Dataset:
     """Creates standard input pipeline (shuffle, preprocess, batch).
 
@@ -418,12 +691,55 @@ def create_dataset(
       rng: A jax.random.PRNG key or a tf.Tensor for TF stateless seeds to use of
         seeding shuffle operations and preprocessing ops. Must be set if
         shuffling.
-      filter_fn: Optional function to filter the decoded examples. This happens
-        before the preprocessing.
+      rng_window_size: Optional number of examples for which to derive
+        per-example RNGs at once (via a single `stateless_split` per window)
+        instead of one `stateless_fold_in` per example. Cheaper for trivial
+        preprocess_fns, but the derived keys differ from the default path and
+        all features must have equal shapes across examples. `None` keeps the
+        per-example derivation.
+      filter_fn: Optional function to filter the examples. This happens before
+        the preprocessing. When the heavyweight features are read undecoded
+        (`decoders=skip_decoders(dataset_builder)`), the filter sees the
+        encoded example and rejected examples never pay for decoding.
       preprocess_fn: Function for preprocessing individual examples (which should
         be Python dictionary of tensors).
+      vectorize: Whether to apply `preprocess_fn` to whole batches via
+        `tf.vectorized_map` instead of once per example. Batching then happens
+        *before* preprocessing, so `preprocess_fn` must consist of vectorizable
+        TF ops. Requires `batch_dims` to be set. Per-example RNGs are derived
+        with a single `stateless_split` per batch, which is cheaper but yields
+        different (still deterministic) keys than the per-example path. Not
+        supported together with `pad_up_to_batches` or
+        `shuffle="preprocessed"`.
       decoders: Optional dictionary of decoder passed to as_dataset.
-      cache: Whether to cache the unprocessed dataset in memory.
+      skip_image_decoding: If True (and `decoders` is not given), image and
+        video features are read as encoded bytes via
+        `skip_decoders(dataset_builder)`. `preprocess_fn` must then decode them
+        itself (see `decode_image_feature()`), which avoids decoding twice when
+        the preprocessing re-decodes anyway (e.g. decode-and-crop) and decoding
+        at all for examples dropped by `filter_fn`. Only applies when a dataset
+        builder is passed.
+      interleave_cycle_length: Optional number of input files to read from
+        concurrently, forwarded to `tfds.ReadConfig`. Pass `tf.data.AUTOTUNE`
+        to saturate (remote) filesystem bandwidth with parallel shard reads.
+        Note that a value that varies between machines (like AUTOTUNE) changes
+        the order in which examples are read, so only the default preserves
+        byte-for-byte identical example order across machines when not
+        shuffling. `None` keeps the TFDS default.
+      interleave_block_length: Optional number of consecutive examples to read
+        from each file before switching to the next one, forwarded to
+        `tfds.ReadConfig`. `None` keeps the TFDS default.
+      cache: Whether to cache the dataset in memory. Either cache the dataset
+        as loaded ("loaded" or True, before shuffling and preprocessing), cache
+        it after preprocessing ("preprocessed"), or not at all (False). Caching
+        after preprocessing makes every epoch after the first a pure memory
+        read, but freezes the per-example RNG across epochs, so it should only
+        be used when `preprocess_fn` is deterministic. With "preprocessed",
+        preprocessing happens before the shuffle stage.
+      cache_path: Optional filename for a file-based cache, forwarded to
+        `tf.data.Dataset.cache`. Use when the (preprocessed) dataset does not
+        fit in memory; subsequent runs read the preprocessed data back from
+        disk. `None` caches in memory.
       num_epochs: Number of epochs for which to repeat the dataset. None to repeat
         forever.
       repeat_after_batching: Whether to `repeat` the dataset before or after batching.
@@ -434,7 +750,21 @@ def create_dataset(
       shuffle_buffer_size: Number of examples in the shuffle buffer.
       prefetch_size: The number of elements in the final dataset to prefetch in
         the background. This should be a small (say <10) positive integer or
-        tf.data.experimental.AUTOTUNE.
+        `tf.data.AUTOTUNE` (the default). When using `tf.data.AUTOTUNE`,
+        consider setting `autotune_ram_budget` to bound buffer growth.
+      autotune_ram_budget: Optional RAM budget (in bytes) for autotuned
+        buffers (e.g. an autotuned `prefetch_size`). Bounds buffer growth so
+        that elastic buffer sizing does not OOM the host. `None` uses the
+        tf.data default (half of available RAM).
+      autotune_cpu_budget: Optional CPU budget (number of cores) that autotuning
+        may use. `None` uses the tf.data default.
+      private_threadpool_size: Size of the threadpool dedicated to this
+        pipeline. `None` (the default) sizes it to the host's CPU count,
+        clamped to [8, 128]. Set explicitly to cap the pipeline's CPU usage on
+        shared hosts.
+      max_intra_op_parallelism: Maximum intra-op parallelism for ops in this
+        pipeline. Kept at 1 so that a single op cannot monopolize the
+        threadpool.
       pad_up_to_batches: Set this option to process the entire dataset. - If set
         with an integer, the dataset is first padded to the specified number of
         batches. A new feature called "mask" is added to every batch. This feature
@@ -448,6 +778,28 @@ def create_dataset(
         `pad_up_to_batches` is specified and the cardinality cannot be retrieved
         via `ds.cardinalty()` (e.g. because of `ds.filter()`).
       drop_remainder: Whether to drop remainders when batching.
+      deterministic_order: Whether parallel transformations (maps, interleaves)
+        must deliver elements in deterministic order. The default True
+        preserves this module's contract that the same `rng` yields the same
+        batches. Setting it to False lets parallel stages emit elements as they
+        complete, reclaiming throughput lost to head-of-line stalls; derived
+        per-example RNGs stay deterministic (they are folded from the example
+        index, not from arrival order), but batch composition may then vary
+        between runs.
+      service_address: Optional address of a tf.data service dispatcher (e.g.
+        "grpc://host:port"). When set, reading, preprocessing and batching are
+        offloaded to the service's worker pool instead of running on the local
+        host, trading local CPU for network bandwidth. Elements are compressed
+        on the wire. Note that the service executes the pipeline with its own
+        resources, so per-host determinism depends on the service deployment.
+      service_job_name: Optional job name under which to register with the
+        tf.data service. Pipelines sharing a job name share the processed data;
+        by default every pipeline gets its own job.
+      service_compression: Compression applied to batches crossing the tf.data
+        service worker/client boundary. "AUTO" (the default) compresses; `None`
+        disables compression, trading bandwidth for worker CPU. Only used when
+        `service_address` is set: TF exposes element compression only at this
+        boundary, not for host-local pipelines.
 
     Returns:
       The dataset with preprocessed and batched examples.
@@ -456,6 +808,24 @@ def create_dataset(
 
     assert not ((shuffle == "preprocessed") and (not repeat_after_batching))
 
+    assert cache in ("loaded", "preprocessed", True, False, None)
+
+    if vectorize:
+        assert batch_dims, "`vectorize` requires `batch_dims` to be set."
+        assert pad_up_to_batches is None, (
+            "`vectorize` is not supported together with `pad_up_to_batches`."
+        )
+        assert shuffle != "preprocessed", (
+            "`vectorize` is not supported together with `shuffle='preprocessed'`."
+        )
+        assert cache != "preprocessed", (
+            "`vectorize` is not supported together with `cache='preprocessed'`."
+        )
+        assert rng_window_size is None, (
+            "`vectorize` is not supported together with `rng_window_size` (the "
+            "vectorized path already derives RNGs one batch at a time)."
+        )
+
     rng_available = rng is not None
     if not rng_available and shuffle:
         raise ValueError("Please set 'rng' when shuffling.")
@@ -463,7 +833,12 @@ def create_dataset(
         if isinstance(rng, tf.Tensor):
             rngs = [x.numpy() for x in tf.random.experimental.stateless_split(rng, 3)]
         else:
-            rngs = list(jax.random.key_data(jax.random.split(rng, 3)))
+            # Split on CPU and materialize immediately: the derived seeds are
+            # identical on every backend, and pinning the split avoids
+            # dispatching a tiny program to the accelerator and blocking on a
+            # device-to-host transfer each time a dataset is built.
+            with jax.default_device(jax.local_devices(backend="cpu")[0]):
+                rngs = list(np.asarray(jax.random.key_data(jax.random.split(rng, 3))))
     else:
         rngs = 3 * [[None, None]]
 
@@ -471,13 +846,48 @@ def create_dataset(
         ds = dataset_or_builder
     else:
         dataset_options = tf.data.Options()
+        dataset_options.deterministic = deterministic_order
         dataset_options.experimental_optimization.map_parallelization = True
-        dataset_options.threading.private_threadpool_size = 48
-        dataset_options.threading.max_intra_op_parallelism = 1
-
+        # The innermost `.batch()` below directly follows the preprocessing
+        # `.map()`, so Grappler can fuse the two into a single `map_and_batch`
+        # op, overlapping per-element processing with batch assembly.
+        dataset_options.experimental_optimization.map_and_batch_fusion = True
+        # Collapse any remaining adjacent maps (e.g. introduced by `decoders`)
+        # into a single per-element function call.
+        dataset_options.experimental_optimization.map_fusion = True
+        dataset_options.experimental_optimization.noop_elimination = True
+        # Coalesce adjacent filters (e.g. `filter_fn` plus filters introduced
+        # by TFDS) into one pass over the data.
+        dataset_options.experimental_optimization.filter_fusion = True
+        # `.shuffle()` is directly followed by `.repeat()` below, so the fused
+        # op keeps one shuffle buffer alive across epoch boundaries instead of
+        # draining and refilling it at every epoch.
+        dataset_options.experimental_optimization.shuffle_and_repeat_fusion = True
+        if autotune_ram_budget is not None or autotune_cpu_budget is not None:
+            dataset_options.autotune.enabled = True
+            if autotune_ram_budget is not None:
+                dataset_options.autotune.ram_budget = autotune_ram_budget
+            if autotune_cpu_budget is not None:
+                dataset_options.autotune.cpu_budget = autotune_cpu_budget
+        if private_threadpool_size is None:
+            # Size the pool to the host: a fixed value oversubscribes small VMs
+            # (context-switch overhead) and leaves large hosts underused.
+            private_threadpool_size = min(max(os.cpu_count() or 8, 8), 128)
+        dataset_options.threading.private_threadpool_size = private_threadpool_size
+        dataset_options.threading.max_intra_op_parallelism = max_intra_op_parallelism
+
+        read_config_kwargs = {}
+        if interleave_cycle_length is not None:
+            read_config_kwargs["interleave_cycle_length"] = interleave_cycle_length
+        if interleave_block_length is not None:
+            read_config_kwargs["interleave_block_length"] = interleave_block_length
         read_config = tfds.ReadConfig(
-            shuffle_seed=rngs.pop()[0], options=dataset_options
+            shuffle_seed=rngs.pop()[0],
+            options=dataset_options,
+            **read_config_kwargs,
         )
+        if skip_image_decoding and decoders is None:
+            decoders = skip_decoders(dataset_or_builder)
         ds = dataset_or_builder.as_dataset(
             split=split,
             shuffle_files=shuffle,
@@ -488,9 +898,40 @@ def create_dataset(
     if filter_fn is not None:
         ds = ds.filter(filter_fn)
 
+    # When padding is requested and there is a preprocessing map anyway, fold
+    # the "mask" feature into it instead of paying for a separate `.map()`
+    # stage in `pad_dataset`.
+    fuse_mask = pad_up_to_batches is not None and preprocess_fn is not None
+    if fuse_mask:
+        if "mask" in ds.element_spec:
+            raise ValueError('Dataset already contains a feature named "mask".')
+        preprocess_fn = _add_mask_to_preprocessed_features(preprocess_fn)
+
+    preprocessed_early = False
+    if cache == "preprocessed" and preprocess_fn is not None and not vectorize:
+        # Preprocess before caching, so later epochs become pure memory reads
+        # instead of re-running the (deterministic) preprocessing.
+        if rng_available:
+            ds = _preprocess_with_per_example_rng(
+                ds,
+                preprocess_fn,
+                rng=rngs.pop(),
+                window_size=rng_window_size,
+                deterministic=deterministic_order,
+            )
+        else:
+            ds = ds.map(
+                preprocess_fn,
+                num_parallel_calls=AUTOTUNE,
+                deterministic=deterministic_order,
+            )
+        preprocessed_early = True
+
     if cache:
-        ds = ds.cache()
+        ds = ds.cache(cache_path) if cache_path else ds.cache()
 
+    # Keep shuffle and repeat adjacent so the shuffle_and_repeat fusion enabled
+    # above applies.
     shuffle_seed = rngs.pop()[0]
     if shuffle == "loaded":
         ds = ds.shuffle(shuffle_buffer_size, seed=shuffle_seed)
@@ -498,11 +939,21 @@ def create_dataset(
     if not repeat_after_batching:
         ds = ds.repeat(num_epochs)
 
-    if preprocess_fn is not None:
+    if preprocess_fn is not None and not vectorize and not preprocessed_early:
         if rng_available:
-            ds = _preprocess_with_per_example_rng(ds, preprocess_fn, rng=rngs.pop())
+            ds = _preprocess_with_per_example_rng(
+                ds,
+                preprocess_fn,
+                rng=rngs.pop(),
+                window_size=rng_window_size,
+                deterministic=deterministic_order,
+            )
         else:
-            ds = ds.map(preprocess_fn, num_parallel_calls=AUTOTUNE)
+            ds = ds.map(
+                preprocess_fn,
+                num_parallel_calls=AUTOTUNE,
+                deterministic=deterministic_order,
+            )
 
     if shuffle == "preprocessed":
         ds = ds.shuffle(shuffle_buffer_size, seed=shuffle_seed)
@@ -516,15 +967,43 @@ def create_dataset(
                 None if pad_up_to_batches == "auto" else pad_up_to_batches
             ),
             cardinality=cardinality,
+            add_mask=not fuse_mask,
         )
 
     if batch_dims:
-        for batch_size in reversed(batch_dims):
-            ds = ds.batch(batch_size, drop_remainder=drop_remainder)
+        if vectorize and preprocess_fn is not None:
+            # Batch first, then preprocess whole batches in one vectorized call.
+            inner_batch_size = batch_dims[-1]
+            ds = ds.batch(inner_batch_size, drop_remainder=drop_remainder)
+            ds = _vectorized_preprocess(
+                ds,
+                preprocess_fn,
+                batch_size=inner_batch_size,
+                rng=rngs.pop() if rng_available else None,
+                deterministic=deterministic_order,
+            )
+            for batch_size in reversed(batch_dims[:-1]):
+                ds = ds.batch(batch_size, drop_remainder=drop_remainder)
+        else:
+            # Keep the innermost batch adjacent to the preprocessing map (no ops
+            # in between) so that the map_and_batch fusion enabled above can
+            # kick in.
+            for batch_size in reversed(batch_dims):
+                ds = ds.batch(batch_size, drop_remainder=drop_remainder)
 
     if repeat_after_batching:
         ds = ds.repeat(num_epochs)
 
+    if service_address is not None:
+        ds = ds.apply(
+            tf.data.experimental.service.distribute(
+                processing_mode="parallel_epochs",
+                service=service_address,
+                job_name=service_job_name,
+                compression=service_compression,
+            )
+        )
+
     return ds.prefetch(prefetch_size)
 
 
@@ -546,10 +1025,15 @@ def create_distributed_dataset(
     repeat_after_batching: bool = False,
     shuffle: Union[Literal["loaded", "preprocessed"], bool] = "loaded",
     shuffle_buffer_size: int = 10_000,
-    prefetch_size: int = 4,
+    prefetch_size: int = tf.data.AUTOTUNE,
+    autotune_ram_budget: Optional[int] = None,
+    autotune_cpu_budget: Optional[int] = None,
     pad_up_to_batches: Optional[int] = None,
     cardinality: Optional[int] = None,
     drop_remainder: bool = True,
+    service_address: Optional[str] = None,
+    service_job_name: Optional[str] = None,
+    service_compression: Optional[str] = "AUTO",
 ) -> tf.data.Dataset:
     """Creates standard input pipeline (shuffle, preprocess, batch).
 
@@ -580,7 +1064,11 @@ def create_distributed_dataset(
       shuffle_buffer_size: Number of examples in the shuffle buffer.
       prefetch_size: The number of elements in the final dataset to prefetch in
         the background. This should be a small (say <10) positive integer or
-        tf.data.experimental.AUTOTUNE.
+        `tf.data.AUTOTUNE` (the default).
+      autotune_ram_budget: Optional RAM budget (in bytes) for autotuned buffers,
+        shared evenly between the per-replica input pipelines.
+      autotune_cpu_budget: Optional CPU budget (number of cores) that autotuning
+        may use in each per-replica input pipeline.
       pad_up_to_batches: Set this option to process the entire dataset. When set,
         then the dataset is first padded to the specified number of batches. A new
         feature called "mask" is added to every batch. This feature is set to
@@ -592,6 +1080,12 @@ def create_distributed_dataset(
         `pad_up_to_batches` is specified and the cardinality cannot be retrieved
         via `ds.cardinalty()` (e.g. because of `ds.filter()`).
       drop_remainder: Whether to drop remainders when batching.
+      service_address: Optional address of a tf.data service dispatcher to
+        offload each per-replica pipeline to. See `create_dataset()`.
+      service_job_name: Optional tf.data service job name. See
+        `create_dataset()`.
+      service_compression: Compression for the tf.data service boundary. See
+        `create_dataset()`.
 
     Returns:
       The dataset with preprocessed and batched examples.
@@ -619,6 +1113,13 @@ def create_distributed_dataset(
             global_batch_size
         )
 
+        if autotune_ram_budget is None:
+            local_ram_budget = None
+        else:
+            local_ram_budget = (
+                autotune_ram_budget // input_context.num_input_pipelines
+            )
+
         return create_dataset(
             dataset_or_builder=dataset_or_builder,
             split=local_split,
@@ -633,14 +1134,64 @@ def create_distributed_dataset(
             shuffle=shuffle,
             shuffle_buffer_size=shuffle_buffer_size,
             prefetch_size=prefetch_size,
+            autotune_ram_budget=local_ram_budget,
+            autotune_cpu_budget=autotune_cpu_budget,
             pad_up_to_batches=pad_up_to_batches,
             cardinality=cardinality,
             drop_remainder=drop_remainder,
+            service_address=service_address,
+            service_job_name=service_job_name,
+            service_compression=service_compression,
         )
 
     return strategy.distribute_datasets_from_function(dataset_fn)
 
 
+def create_iterator(
+    dataset: tf.data.Dataset, *, num_prefetch: int = 2
+) -> Iterator[Any]:
+    """Iterates over `dataset`, converting batches to numpy off-thread.
+
+    Calling `jax.tree_map(lambda x: x._numpy(), next(ds_iter))` on the training
+    thread serializes the tensor-to-numpy conversion with the train step. This
+    helper pulls from the dataset and converts on a daemon thread instead,
+    handing finished batches over through a bounded queue, so the conversion of
+    the next batch overlaps with the current training step. Use
+    `start_input_pipeline()` instead when batches should additionally be
+    prefetched onto the devices.
+
+    Args:
+      dataset: Dataset of batches, e.g. as returned by `create_dataset()`.
+      num_prefetch: Number of converted batches to buffer ahead of the
+        consumer. Must be positive (`queue.Queue` would treat 0 as unbounded).
+
+    Yields:
+      Batches of `dataset` with all tensors converted to numpy arrays (without
+      an extra copy where possible).
+    """
+    if num_prefetch < 1:
+        raise ValueError(f"num_prefetch must be positive, got {num_prefetch}.")
+    batches = queue.Queue(maxsize=num_prefetch)
+    end_of_dataset = object()
+
+    def producer():
+        try:
+            for batch in dataset:
+                batches.put(jax.tree_util.tree_map(lambda x: x._numpy(), batch))  # pylint: disable=protected-access
+            batches.put(end_of_dataset)
+        except Exception as e:  # pylint: disable=broad-except
+            batches.put(e)
+
+    threading.Thread(target=producer, daemon=True).start()
+    while True:
+        batch = batches.get()
+        if batch is end_of_dataset:
+            return
+        if isinstance(batch, Exception):
+            raise batch
+        yield batch
+
+
 import flax
 
 def start_input_pipeline(dataset):
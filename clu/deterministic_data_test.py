@@ -23,6 +23,7 @@ from unittest import mock
 from absl.testing import parameterized
 from clu import deterministic_data
 import jax
+import numpy as np
 from packaging import version
 import tensorflow as tf
 import tensorflow_datasets as tfds
@@ -219,6 +220,121 @@ class DeterministicDataTest(tf.test.TestCase, parameterized.TestCase):
         },
     ], list(ds_out))
 
+  def test_preprocess_with_per_example_rng_windowed(self):
+
+    def preprocess_fn(features):
+      features["b"] = tf.random.stateless_uniform([], features["rng"])
+      return features
+
+    rng = jax.random.PRNGKey(42)
+    ds_in = tf.data.Dataset.from_tensor_slices({"a": [37.2, 31.2, 39.0]})
+
+    def derive():
+      return list(deterministic_data._preprocess_with_per_example_rng(
+          ds_in, preprocess_fn, rng=rng, window_size=2))
+
+    ds_out = derive()
+    self.assertLen(ds_out, 3)
+    self.assertAllClose([37.2, 31.2, 39.0], [e["a"] for e in ds_out])
+    # Keys are distinct per example (within and across windows) and the
+    # derivation is deterministic.
+    self.assertLen({float(e["b"]) for e in ds_out}, 3)
+    self.assertAllClose(ds_out, derive())
+
+  def test_skip_decoders(self):
+    dataset_builder = mock.Mock()
+    dataset_builder.info.features = {
+        "image": tfds.features.Image(),
+        "label": tfds.features.ClassLabel(num_classes=2),
+    }
+    decoders = deterministic_data.skip_decoders(dataset_builder)
+    self.assertEqual(["image"], list(decoders))
+    self.assertIsInstance(decoders["image"], tfds.decode.SkipDecoding)
+
+  def test_create_dataset_skip_image_decoding(self):
+    dataset_builder = mock.Mock()
+    dataset_builder.info.features = {
+        "image": tfds.features.Image(),
+        "label": tfds.features.ClassLabel(num_classes=2),
+    }
+    dataset_builder.as_dataset.return_value = (
+        tf.data.Dataset.from_tensor_slices(dict(x=[1.0])))
+    deterministic_data.create_dataset(
+        dataset_builder,
+        split="(ignored)",
+        shuffle=False,
+        num_epochs=1,
+        skip_image_decoding=True)
+    decoders = dataset_builder.as_dataset.call_args.kwargs["decoders"]
+    self.assertIsInstance(decoders["image"], tfds.decode.SkipDecoding)
+    self.assertNotIn("label", decoders)
+
+  def test_decode_image_feature(self):
+    image = tf.cast(tf.fill((4, 6, 3), 128), tf.uint8)
+    features = {"image": tf.io.encode_jpeg(image), "label": 1}
+    decoded = deterministic_data.decode_image_feature(features)
+    self.assertEqual((4, 6, 3), decoded["image"].shape)
+    self.assertEqual(tf.uint8, decoded["image"].dtype)
+
+  def test_create_dataset_cache_preprocessed(self):
+
+    def preprocess_fn(features):
+      features["b"] = tf.random.stateless_uniform([], features["rng"])
+      return features
+
+    def make_dataset(cache):
+      dataset_builder = mock.Mock()
+      dataset_builder.as_dataset.return_value = (
+          tf.data.Dataset.from_tensor_slices(dict(a=[1.0, 2.0])))
+      return deterministic_data.create_dataset(
+          dataset_builder,
+          split="(ignored)",
+          batch_dims=[2],
+          rng=jax.random.PRNGKey(0),
+          preprocess_fn=preprocess_fn,
+          cache=cache,
+          shuffle=False,
+          num_epochs=2)
+
+    # With cache="preprocessed" every epoch reads the same preprocessed data.
+    batches = list(make_dataset("preprocessed"))
+    self.assertLen(batches, 2)
+    self.assertAllClose(batches[0], batches[1])
+    # Without it the per-example RNG advances across epochs.
+    batches = list(make_dataset(False))
+    self.assertNotAllClose(batches[0]["b"], batches[1]["b"])
+
+  @parameterized.parameters(True, False)
+  def test_create_dataset_vectorized(self, rng_available: bool):
+
+    def preprocess_fn(features):
+      features["b"] = features["a"] * 2
+      if "rng" in features:
+        features["b"] += tf.random.stateless_uniform([], features["rng"])
+      return features
+
+    dataset_builder = mock.Mock()
+    dataset_builder.as_dataset.return_value = tf.data.Dataset.from_tensor_slices(
+        dict(a=tf.range(8.)))
+    rng = jax.random.PRNGKey(42) if rng_available else None
+    batches = []
+    for _ in range(2):
+      ds = deterministic_data.create_dataset(
+          dataset_builder,
+          split="(ignored)",
+          batch_dims=[2, 2],
+          rng=rng,
+          preprocess_fn=preprocess_fn,
+          vectorize=True,
+          shuffle=False,
+          num_epochs=1)
+      batches.append(list(ds))
+    self.assertLen(batches[0], 2)
+    self.assertEqual(batches[0][0]["a"].shape, (2, 2))
+    self.assertEqual(batches[0][0]["b"].shape, (2, 2))
+    # Preprocessing is deterministic given the same `rng`.
+    self.assertAllClose(batches[0], batches[1])
+
   @parameterized.parameters(*itertools.product([2, "auto"], [True, False]))
   def test_create_dataset_padding(self, pad_up_to_batches, cardinality):
     dataset_builder = mock.Mock()
@@ -255,6 +371,36 @@ class DeterministicDataTest(tf.test.TestCase, parameterized.TestCase):
     with self.assertRaises(StopIteration):
       next(ds_iter)
 
+  def test_create_dataset_padding_with_preprocess_fn(self):
+    # The "mask" feature is fused into the preprocessing map.
+    dataset_builder = mock.Mock()
+    dataset_builder.as_dataset.return_value = tf.data.Dataset.from_tensor_slices(
+        dict(x=tf.ones((12, 10)), y=tf.ones(12)))
+    ds = deterministic_data.create_dataset(
+        dataset_builder,
+        split="(ignored)",
+        batch_dims=(2, 5),
+        num_epochs=1,
+        shuffle=False,
+        preprocess_fn=lambda features: dict(features, y=features["y"] + 1),
+        pad_up_to_batches=2,
+    )
+    ds_iter = iter(ds)
+    self.assertAllClose(
+        dict(
+            x=tf.ones((2, 5, 10)),
+            y=2 * tf.ones((2, 5)),
+            mask=tf.ones((2, 5), bool),
+        ), next(ds_iter))
+    batch = next(ds_iter)
+    self.assertAllClose(
+        tf.reshape(tf.concat([tf.ones(2, bool), tf.zeros(8, bool)], axis=0),
+                   (2, 5)), batch["mask"])
+    # Padded examples are zeros and not preprocessed.
+    self.assertAllClose(
+        tf.reshape(tf.concat([2 * tf.ones(2), tf.zeros(8)], axis=0), (2, 5)),
+        batch["y"])
+
   def test_create_dataset_padding_raises_error_cardinality(self):
     dataset_builder = mock.Mock()
     dataset = tf.data.Dataset.from_tensor_slices(
@@ -305,6 +451,43 @@ class DeterministicDataTest(tf.test.TestCase, parameterized.TestCase):
          "mask": tf.concat([tf.ones(12, bool), tf.zeros(8, bool)], axis=0)},
         next(iter(padded_dataset.batch(20))))
 
+  @parameterized.parameters(*itertools.product(range(1, 20), range(1, 4)))
+  def test_shard_dataset_for_host(self, num_examples: int, host_count: int):
+    ds = tf.data.Dataset.range(num_examples).map(lambda i: {"index": i})
+    shards = []
+    for host_id in range(host_count):
+      shard = deterministic_data.shard_dataset_for_host(
+          ds, host_id=host_id, host_count=host_count)
+      shards.append([int(e["index"]) for e in shard])
+    # All hosts get the same number of examples, remainder is dropped.
+    self.assertLen({len(s) for s in shards}, 1)
+    # Together the shards cover the evenly divisible prefix, without overlap.
+    merged = sorted(itertools.chain(*shards))
+    self.assertEqual(
+        list(range(num_examples - num_examples % host_count)), merged)
+
+  def test_shard_dataset_for_host_unknown_cardinality(self):
+    ds = tf.data.Dataset.range(10).filter(lambda i: True)
+    with self.assertRaisesRegex(ValueError,
+                                r"^Cannot determine dataset cardinality."):
+      deterministic_data.shard_dataset_for_host(ds, host_id=0, host_count=2)
+
+  def test_shard_dataset_for_host_invalid_host_id(self):
+    ds = tf.data.Dataset.range(10)
+    with self.assertRaises(ValueError):
+      deterministic_data.shard_dataset_for_host(ds, host_id=2, host_count=2)
+
+  def test_create_iterator(self):
+    dataset = tf.data.Dataset.from_tensor_slices(
+        dict(x=tf.reshape(tf.range(12.0), (6, 2)))).batch(2)
+    batches = list(deterministic_data.create_iterator(dataset))
+    self.assertLen(batches, 3)
+    for batch in batches:
+      self.assertIsInstance(batch["x"], np.ndarray)
+    self.assertAllClose(
+        tf.reshape(tf.range(12.0), (6, 2)),
+        np.concatenate([batch["x"] for batch in batches]))
+
   @parameterized.parameters(*itertools.product(range(20), range(1, 4)))
   def test_same_cardinality_on_all_hosts(self, num_examples: int,
                                          host_count: int):